@@ -1,18 +1,423 @@
 import sys
 import re
-import ast
+import types
+import codecs
+import hashlib
 import subprocess
 import tempfile
+import tokenize
 import os
 import venv
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from itertools import chain
 from PySide6.QtWidgets import (QApplication, QMainWindow, QPlainTextEdit,
                                QFileDialog, QMessageBox, QToolBar, QStatusBar,
                                QTextEdit, QSplitter, QCompleter, QInputDialog, QWidget,
                                QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
                                QLabel, QCheckBox, QRadioButton, QButtonGroup, QGroupBox)
-from PySide6.QtCore import Qt, QRegularExpression, QProcess, QStringListModel, QRect, QTimer, QUrl
+from PySide6.QtCore import (Qt, QRegularExpression, QProcess, QStringListModel, QRect, QTimer, QUrl,
+                            QObject, QRunnable, QThreadPool, Signal, QEvent,
+                            QSaveFile, QIODevice)
 from PySide6.QtGui import (QSyntaxHighlighter, QTextCharFormat, QColor,
-                           QFont, QKeyEvent, QAction, QTextCursor, QPainter, QPalette, QTextDocument, QKeySequence)
+                           QFont, QKeyEvent, QAction, QTextCursor, QPainter, QPalette, QTextDocument, QKeySequence,
+                           QStaticText)
+
+
+# Python keywords (highest priority)
+_KEYWORDS = frozenset((
+    'and', 'as', 'assert', 'break', 'class', 'continue', 'def',
+    'del', 'elif', 'else', 'except', 'False', 'finally', 'for',
+    'from', 'global', 'if', 'import', 'in', 'is', 'lambda', 'None',
+    'nonlocal', 'not', 'or', 'pass', 'raise', 'return', 'True',
+    'try', 'while', 'with', 'yield', 'async', 'await'
+))
+
+# Built-in functions and exceptions
+_BUILTINS = frozenset((
+    'abs', 'all', 'any', 'bin', 'bool', 'bytes', 'chr', 'dict',
+    'dir', 'enumerate', 'filter', 'float', 'getattr', 'hasattr',
+    'int', 'isinstance', 'issubclass', 'len', 'list', 'map', 'max',
+    'min', 'open', 'print', 'range', 'reversed', 'set', 'setattr',
+    'sorted', 'str', 'sum', 'tuple', 'type', 'zip', 'Exception', 'ValueError',
+    'TypeError', 'KeyError', 'IndexError', 'AttributeError',
+    'RuntimeError', 'StopIteration', 'NotImplementedError'
+))
+
+# Type annotations
+_TYPE_HINTS = frozenset((
+    'List', 'Dict', 'Set', 'Tuple', 'Optional', 'Union', 'Any', 'Callable',
+    'Iterable', 'Iterator', 'Sequence', 'Mapping', 'Type', 'TypeVar',
+    'Generic', 'Protocol', 'Literal', 'Final', 'ClassVar'
+))
+
+# Return annotations offered as completions
+_RETURN_PATTERNS = frozenset((
+    '-> None:', '-> str:', '-> int:', '-> float:', '-> bool:',
+    '-> list:', '-> dict:', '-> tuple:', '-> List[str]:', '-> List[int]:',
+    '-> Dict[str, Any]:', '-> Optional[str]:', '-> Optional[int]:',
+))
+
+# Words always offered by autocomplete, whatever the document contains
+_STATIC_COMPLETIONS = _KEYWORDS | _BUILTINS | _TYPE_HINTS | _RETURN_PATTERNS
+
+# Completion changes applied row by row; larger ones reset the model
+_COMPLETION_PATCH_LIMIT = 32
+
+
+@lru_cache(maxsize=None)
+def _monospace_family():
+    """Return Consolas if it is installed, else Courier New, asking the font database once"""
+    return "Consolas" if QFont("Consolas", 10).exactMatch() else "Courier New"
+
+
+def _regex(pattern):
+    """Build a QRegularExpression and JIT-compile it up front"""
+    regex = QRegularExpression(pattern)
+    regex.optimize()
+    return regex
+
+
+# All highlighting rules are folded into one ordered alternation so a block is
+# tokenized in a single left-to-right pass. Where several rules used to match at
+# the same place the one that was applied last wins, so it comes first here; the
+# name in "@decorator(" is left to the call alternative. A comment ends the pass
+_TOKEN_PATTERN = _regex(
+    r'(#.*)'
+    r'|(\bclass\s+\w+)'
+    r'|(\bdef\s+\w+|\b\w+(?=\s*\())'
+    r'|(@(?>\w+)(?!\s*\()|@(?=\w))'
+    r'|(\b[+-]?[0-9]+\.?[0-9]*(?:[eE][+-]?[0-9]+)?\b)'
+    r'|(\b[A-Za-z_]\w*\b)'
+)
+# Format applied for each capture group of _TOKEN_PATTERN; identifiers in the
+# last group are classified by set lookup
+_TOKEN_FORMATS = (None, 'comment_format', 'class_format', 'function_format',
+                  'decorator_format', 'number_format')
+_COMMENT_GROUP = 1
+_WORD_GROUP = len(_TOKEN_FORMATS)
+_WORD_CLASSES = (
+    (_KEYWORDS, 'keyword_format'),
+    (_BUILTINS, 'builtin_format'),
+    (_TYPE_HINTS, 'type_format'),
+    (frozenset(('self',)), 'self_format'),
+)
+
+# Highlight colors per theme (True is dark), matching PyCharm's
+_THEME_COLORS = {
+    True: {
+        'keyword': "#CC7832",
+        'string': "#6A8759",
+        'comment': "#808080",
+        'function': "#FFC66D",
+        'class': "#A9B7C6",
+        'number': "#6897BB",
+        'decorator': "#BBB529",
+        'builtin': "#8888C6",
+        'self': "#94558D",
+        'type': "#8888C6",
+    },
+    False: {
+        'keyword': "#0000FF",
+        'string': "#008000",
+        'comment': "#808080",
+        'function': "#795E26",
+        'class': "#267F99",
+        'number': "#098658",
+        'decorator': "#AF00DB",
+        'builtin': "#0000FF",
+        'self': "#001080",
+        'type': "#267F99",
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def _theme_formats(is_dark_mode):
+    """Build the highlighter's character formats for a theme, once per theme"""
+    colors = _THEME_COLORS[is_dark_mode]
+
+    def char_format(color, bold=False, italic=False):
+        text_format = QTextCharFormat()
+        text_format.setForeground(QColor(colors[color]))
+        if bold:
+            text_format.setFontWeight(QFont.Bold)
+        if italic:
+            text_format.setFontItalic(True)
+        return text_format
+
+    return {
+        'keyword_format': char_format('keyword', bold=True),
+        'string_format': char_format('string'),
+        'fstring_brace_format': char_format('keyword', bold=True),
+        'comment_format': char_format('comment', italic=True),
+        'function_format': char_format('function'),
+        'class_format': char_format('class', bold=True),
+        'number_format': char_format('number'),
+        'decorator_format': char_format('decorator'),
+        'builtin_format': char_format('builtin'),
+        'self_format': char_format('self', italic=True),
+        'type_format': char_format('type'),
+    }
+
+
+# Theme preference, saved in the working directory
+_THEME_FILE = '.microid_theme'
+
+
+@lru_cache(maxsize=None)
+def _saved_dark_mode():
+    """Read the saved theme once per process, defaulting to dark when there is none"""
+    try:
+        with open(_THEME_FILE, 'r') as f:
+            return f.read().strip() == 'dark'
+    except (OSError, ValueError):
+        return True
+
+
+# Either triple-quote delimiter, and the block state recording which one is
+# still open at the end of a line
+_TRIPLE_RE = re.compile(r'"""|\'\'\'')
+_TRIPLE_STATES = {'"""': 1, "'''": 2}
+_TRIPLE_DELIMITERS = {state: delimiter for delimiter, state in _TRIPLE_STATES.items()}
+
+# Documents longer than this only get triple-quote state and formats for
+# blocks off screen; such blocks carry the pending bit in their state and are
+# fully highlighted when the editor shows them. Masking a state with
+# _TRIPLE_STATE_MASK drops the bit; the first block's -1 is clamped to 0
+# beforehand, since -1 & 3 would be 3
+_LAZY_HIGHLIGHT_BLOCKS = 5000
+_PENDING_STATE = 4
+_TRIPLE_STATE_MASK = 3
+
+# Highlighted lines remembered per highlighter before the cache is reset
+_BLOCK_CACHE_SIZE = 20000
+
+# A single-line string literal: an optional single prefix letter, then a
+# quoted body with backslash escapes; a literal left open runs to the end
+# of the line and leaves both closing-quote groups unset
+_STRING_RE = re.compile(r'''[fFrRbBuU]?(?:"(?:\\.|[^"\\])*(?:(")|\\?$)|'(?:\\.|[^'\\])*(?:(')|\\?$))''')
+
+
+# Either f-string brace
+_BRACE_RE = re.compile(r'[{}]')
+
+
+def _scan_strings(text):
+    """Return (start, length, is_fstring) spans of the string literals in a line"""
+    spans = []
+    for match in _STRING_RE.finditer(text):
+        if match.group(1) is None and match.group(2) is None:
+            # Unterminated string swallows the rest of the line
+            break
+        start = match.start()
+        spans.append((start, match.end() - start, text[start] in 'fF'))
+    return spans
+
+
+def _scan_fstring_braces(text, start, end):
+    """Return positions of the replacement-field braces in an f-string"""
+    positions = []
+    depth = 0
+    brace_start = 0
+    # Only braces change the state, so jump between them instead of walking
+    # every character
+    for match in _BRACE_RE.finditer(text, start, end):
+        i = match.start()
+        if depth:
+            if text[i] == '{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    positions.append(brace_start)
+                    positions.append(i)
+        elif text[i] == '{':
+            if i + 1 >= end or text[i + 1] != '{':
+                brace_start = i
+                depth = 1
+        elif i + 1 >= end or text[i + 1] != '}':
+            positions.append(i)
+    return positions
+
+
+def _merge_spans(spans):
+    """Merge (start, end) spans into sorted, disjoint start and end lists"""
+    starts = []
+    ends = []
+    for start, end in sorted(spans):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+# Names that become completion candidates when they are defined, assigned or
+# imported, one alternative per kind so a line is scanned once. Matching inside
+# a lookahead consumes nothing, so overlapping matches are still all found; the
+# name after "from x import" is the one "import" already captures
+_IDENTIFIER_RE = re.compile(r'\b(?=def\s+(\w+)|class\s+(\w+)|([a-zA-Z_]\w*)\s*=|import\s+(\w+))')
+
+
+def _scan_identifiers(text):
+    """Return the names defined, assigned or imported in a line of code"""
+    identifiers = set()
+    for match in _IDENTIFIER_RE.finditer(text):
+        identifiers.add(match.group(match.lastindex))
+
+    return frozenset(identifiers)
+
+
+# Indentation that starts a non-blank line: a tab, or the run of leading spaces
+_INDENT_RE = re.compile(r'^(\t| +)(?=.*\S)', re.MULTILINE)
+
+# A one-line function signature ending in a colon
+_DEF_LINE_RE = re.compile(r'^\s*def\s+\w+\([^)]*\)\s*:\s*$')
+
+# Name a line defines for jump to definition: a function, a class or an assignment target
+_DEFINITION_RE = re.compile(r'\s*(?:def\s+(\w+)\s*\(|class\s+(\w+)\s*[\(:]|(\w+)\s*=)')
+
+# Line reference in a traceback or error message shown in the output console
+_LINE_REF_RE = re.compile(r'line\s+(\d+)')
+
+
+def _scan_definition(text):
+    """Return the name defined by a line of code, or None"""
+    match = _DEFINITION_RE.match(text)
+    if match is None:
+        return None
+    return match.group(match.lastindex)
+
+
+# Existing typing import, and the line the "Add typing import" action inserts
+_TYPING_RE = _regex(r'from\s+typing\s+import')
+_TYPING_IMPORT_LINE = "from typing import List, Dict, Optional, Union, Any, Tuple, Set, Callable"
+
+
+# Tokens that never start or belong to a statement, and string prefixes
+# that keep a leading string from being a docstring
+_LAYOUT_TOKENS = frozenset((tokenize.COMMENT, tokenize.NL, tokenize.INDENT,
+                            tokenize.DEDENT, tokenize.ENDMARKER))
+_BYTES_OR_FSTRING_RE = re.compile(r'[a-zA-Z]*[bBfF]')
+
+
+def _document_lines(document):
+    """Yield the lines of a QTextDocument with their newlines, reading blocks on demand"""
+    block = document.begin()
+    while block.isValid():
+        yield block.text() + '\n'
+        block = block.next()
+
+
+def _import_insert_line(lines):
+    """Return the line after the module docstring and leading imports of some source lines"""
+    lines = iter(lines)
+    first_line = next(lines, '')
+    insert_line = 0
+
+    # Statements are logical lines split on NEWLINE and ';'. Reading stops at
+    # the first statement that is not the docstring or an import, so the rest
+    # of the source is never fetched and errors further down are never reached
+    statement = []
+    first = True
+    try:
+        for token in tokenize.generate_tokens(chain((first_line,), lines).__next__):
+            if token.type == tokenize.NEWLINE or token.string == ';':
+                if not statement:
+                    continue
+                is_docstring = first and all(
+                    t.type == tokenize.STRING and not _BYTES_OR_FSTRING_RE.match(t.string)
+                    for t in statement)
+                if not (is_docstring or statement[0].string in ('import', 'from')):
+                    break
+                insert_line = token.start[0]
+                first = False
+                statement = []
+            elif token.type not in _LAYOUT_TOKENS:
+                statement.append(token)
+    except (tokenize.TokenError, SyntaxError):
+        pass
+
+    if insert_line == 0 and first_line.startswith('#!'):
+        insert_line = 1
+    return insert_line
+
+
+# Number of compiled sources kept by PythonEditor.parse_code
+_PARSE_CACHE_SIZE = 8
+
+
+def _source_key(code):
+    """Key a source text in the parse cache"""
+    return hashlib.sha256(code.encode('utf-8', errors='surrogatepass')).digest()
+
+
+def _compile_source(code):
+    """Compile source to a code object, raising SyntaxError if it is invalid"""
+    return compile(code, '<editor>', 'exec', dont_inherit=True)
+
+
+class _ParseSignals(QObject):
+    """Carries parse results from the thread pool back to the GUI thread"""
+
+    finished = Signal(bytes, int, object)
+
+
+class _ParseJob(QRunnable):
+    """Parse source code off the GUI thread"""
+
+    def __init__(self, code, key, revision, signals):
+        super().__init__()
+        self.code = code
+        self.key = key
+        self.revision = revision
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = _compile_source(self.code)
+        except Exception as e:
+            result = e
+        self.signals.finished.emit(self.key, self.revision, result)
+
+
+def _venv_python(venv_path):
+    """Return the path of a virtual environment's Python interpreter"""
+    if sys.platform == "win32":
+        return os.path.join(venv_path, "Scripts", "python.exe")
+    return os.path.join(venv_path, "bin", "python")
+
+
+class _VenvSignals(QObject):
+    """Carries the outcome of a venv creation back to the GUI thread"""
+
+    finished = Signal(str, object)
+
+
+class _VenvJob(QRunnable):
+    """Create a virtual environment off the GUI thread"""
+
+    def __init__(self, venv_path, system_site_packages, signals):
+        super().__init__()
+        self.venv_path = venv_path
+        self.system_site_packages = system_site_packages
+        self.signals = signals
+
+    def run(self):
+        error = None
+        try:
+            builder = venv.EnvBuilder(
+                system_site_packages=self.system_site_packages,
+                clear=True,
+                with_pip=True
+            )
+            builder.create(self.venv_path)
+        except Exception as e:
+            error = e
+        self.signals.finished.emit(self.venv_path, error)
 
 
 class VenvDialog(QDialog):
@@ -21,6 +426,10 @@ class VenvDialog(QDialog):
     def __init__(self, current_venv=None, parent=None):
         super().__init__(parent)
         self.selected_venv = current_venv
+        # Creation runs on the thread pool; the dialog stays open until it ends
+        self.creating = False
+        self.venv_signals = _VenvSignals(self)
+        self.venv_signals.finished.connect(self.on_venv_created)
         self.init_ui()
 
     def init_ui(self):
@@ -112,13 +521,13 @@ class VenvDialog(QDialog):
         # Buttons
         button_layout = QHBoxLayout()
 
-        ok_btn = QPushButton("OK")
-        ok_btn.clicked.connect(self.on_ok)
-        button_layout.addWidget(ok_btn)
+        self.ok_button = QPushButton("OK")
+        self.ok_button.clicked.connect(self.on_ok)
+        button_layout.addWidget(self.ok_button)
 
-        cancel_btn = QPushButton("Cancel")
-        cancel_btn.clicked.connect(self.reject)
-        button_layout.addWidget(cancel_btn)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.cancel_button)
 
         layout.addLayout(button_layout)
 
@@ -176,34 +585,42 @@ class VenvDialog(QDialog):
             if reply == QMessageBox.No:
                 return
 
-        try:
-            self.status_label.setText("Creating virtual environment...")
-            QApplication.processEvents()
-
-            # Create venv
-            builder = venv.EnvBuilder(
-                system_site_packages=self.system_packages_check.isChecked(),
-                clear=True,
-                with_pip=True
-            )
-            builder.create(venv_path)
-
-            self.selected_venv = venv_path
-            self.status_label.setText(f"Successfully created: {venv_path}")
-            QMessageBox.information(
-                self,
-                "Success",
-                f"Virtual environment created at:\n{venv_path}"
-            )
-            self.accept()
+        self.status_label.setText("Creating virtual environment...")
+        self.set_creating(True)
+        job = _VenvJob(venv_path, self.system_packages_check.isChecked(), self.venv_signals)
+        QThreadPool.globalInstance().start(job)
 
-        except Exception as e:
-            self.status_label.setText(f"Error: {str(e)}")
+    def on_venv_created(self, venv_path, error):
+        """Report a finished venv creation, closing the dialog on success"""
+        self.set_creating(False)
+        if error is not None:
+            self.status_label.setText(f"Error: {str(error)}")
             QMessageBox.critical(
                 self,
                 "Error",
-                f"Failed to create virtual environment:\n{str(e)}"
+                f"Failed to create virtual environment:\n{str(error)}"
             )
+            return
+
+        self.selected_venv = venv_path
+        self.status_label.setText(f"Successfully created: {venv_path}")
+        QMessageBox.information(
+            self,
+            "Success",
+            f"Virtual environment created at:\n{venv_path}"
+        )
+        self.accept()
+
+    def set_creating(self, creating):
+        """Lock the dialog's buttons while an environment is being created"""
+        self.creating = creating
+        self.ok_button.setEnabled(not creating)
+        self.cancel_button.setEnabled(not creating)
+
+    def reject(self):
+        """Close the dialog unless an environment is still being created"""
+        if not self.creating:
+            super().reject()
 
     def select_venv(self):
         """Select an existing virtual environment"""
@@ -213,17 +630,13 @@ class VenvDialog(QDialog):
             self.status_label.setText("Please select a virtual environment directory")
             return
 
-        if not os.path.exists(venv_path):
-            self.status_label.setText("Directory does not exist")
-            return
-
-        # Check if it's a valid venv
-        if sys.platform == "win32":
-            python_exe = os.path.join(venv_path, "Scripts", "python.exe")
-        else:
-            python_exe = os.path.join(venv_path, "bin", "python")
-
+        # Check if it's a valid venv; a found interpreter implies the
+        # directory exists, so that is only checked when it is missing
+        python_exe = _venv_python(venv_path)
         if not os.path.exists(python_exe):
+            if not os.path.exists(venv_path):
+                self.status_label.setText("Directory does not exist")
+                return
             QMessageBox.warning(
                 self,
                 "Invalid Environment",
@@ -245,270 +658,189 @@ class PythonHighlighter(QSyntaxHighlighter):
         self.is_dark_mode = is_dark_mode
         self.setup_formats()
 
+        # Formats and end state of highlighted blocks, keyed by the previous
+        # block's state and the block text, so unchanged lines that Qt asks to
+        # rehighlight are replayed instead of rescanned
+        self.block_cache = {}
+        self.recorded_formats = None
+        # Set to fully highlight the next block even in a long document
+        self.force_full = False
+        # Set once any block has been left pending, cleared by the next full rehighlight
+        self.deferred = False
+
     def setup_formats(self):
         """Setup text formats based on theme"""
-        # Define formats matching PyCharm theme
-        if self.is_dark_mode:
-            # Dark theme colors
-            keyword_color = "#CC7832"
-            string_color = "#6A8759"
-            comment_color = "#808080"
-            function_color = "#FFC66D"
-            class_color = "#A9B7C6"
-            number_color = "#6897BB"
-            decorator_color = "#BBB529"
-            builtin_color = "#8888C6"
-            self_color = "#94558D"
-            type_color = "#8888C6"
-        else:
-            # Light theme colors
-            keyword_color = "#0000FF"
-            string_color = "#008000"
-            comment_color = "#808080"
-            function_color = "#795E26"
-            class_color = "#267F99"
-            number_color = "#098658"
-            decorator_color = "#AF00DB"
-            builtin_color = "#0000FF"
-            self_color = "#001080"
-            type_color = "#267F99"
-
-        self.keyword_format = QTextCharFormat()
-        self.keyword_format.setForeground(QColor(keyword_color))
-        self.keyword_format.setFontWeight(QFont.Bold)
-
-        self.string_format = QTextCharFormat()
-        self.string_format.setForeground(QColor(string_color))
-
-        self.fstring_brace_format = QTextCharFormat()
-        self.fstring_brace_format.setForeground(QColor(keyword_color))
-        self.fstring_brace_format.setFontWeight(QFont.Bold)
-
-        self.comment_format = QTextCharFormat()
-        self.comment_format.setForeground(QColor(comment_color))
-        self.comment_format.setFontItalic(True)
-
-        self.function_format = QTextCharFormat()
-        self.function_format.setForeground(QColor(function_color))
-
-        self.class_format = QTextCharFormat()
-        self.class_format.setForeground(QColor(class_color))
-        self.class_format.setFontWeight(QFont.Bold)
-
-        self.number_format = QTextCharFormat()
-        self.number_format.setForeground(QColor(number_color))
-
-        self.decorator_format = QTextCharFormat()
-        self.decorator_format.setForeground(QColor(decorator_color))
-
-        self.builtin_format = QTextCharFormat()
-        self.builtin_format.setForeground(QColor(builtin_color))
-
-        self.self_format = QTextCharFormat()
-        self.self_format.setForeground(QColor(self_color))
-        self.self_format.setFontItalic(True)
-
-        self.type_format = QTextCharFormat()
-        self.type_format.setForeground(QColor(type_color))
-
-        # Store patterns as instance variables for later use
-        self.highlighting_rules = []
-        self.comment_pattern = QRegularExpression(r'#[^\n]*')
-
-        # Keywords (highest priority)
-        keywords = [
-            'and', 'as', 'assert', 'break', 'class', 'continue', 'def',
-            'del', 'elif', 'else', 'except', 'False', 'finally', 'for',
-            'from', 'global', 'if', 'import', 'in', 'is', 'lambda', 'None',
-            'nonlocal', 'not', 'or', 'pass', 'raise', 'return', 'True',
-            'try', 'while', 'with', 'yield', 'async', 'await'
-        ]
-
-        keyword_pattern = r'\b(' + '|'.join(keywords) + r')\b'
-        self.highlighting_rules.append((QRegularExpression(keyword_pattern), self.keyword_format))
-
-        # Built-in functions and exceptions
-        builtins = [
-            'abs', 'all', 'any', 'bin', 'bool', 'bytes', 'chr', 'dict',
-            'dir', 'enumerate', 'filter', 'float', 'int', 'len', 'list',
-            'map', 'max', 'min', 'open', 'print', 'range', 'set', 'str',
-            'sum', 'tuple', 'type', 'zip', 'Exception', 'ValueError',
-            'TypeError', 'KeyError', 'IndexError', 'AttributeError',
-            'RuntimeError', 'StopIteration', 'NotImplementedError'
-        ]
-
-        builtin_pattern = r'\b(' + '|'.join(builtins) + r')\b'
-        self.highlighting_rules.append((QRegularExpression(builtin_pattern), self.builtin_format))
-
-        # Type annotations
-        type_hints = [
-            'List', 'Dict', 'Set', 'Tuple', 'Optional', 'Union', 'Any', 'Callable',
-            'Iterable', 'Iterator', 'Sequence', 'Mapping', 'Type', 'TypeVar',
-            'Generic', 'Protocol', 'Literal', 'Final', 'ClassVar'
-        ]
-        type_pattern = r'\b(' + '|'.join(type_hints) + r')\b'
-        self.highlighting_rules.append((QRegularExpression(type_pattern), self.type_format))
-
-        # self keyword
-        self.highlighting_rules.append((QRegularExpression(r'\bself\b'), self.self_format))
-
-        # Numbers
-        self.highlighting_rules.append(
-            (QRegularExpression(r'\b[+-]?[0-9]+\.?[0-9]*([eE][+-]?[0-9]+)?\b'), self.number_format))
-
-        # Decorators
-        self.highlighting_rules.append((QRegularExpression(r'@\w+'), self.decorator_format))
-
-        # Function definitions
-        self.highlighting_rules.append((QRegularExpression(r'\bdef\s+(\w+)'), self.function_format))
-
-        # Function calls
-        self.highlighting_rules.append((QRegularExpression(r'\b(\w+)(?=\s*\()'), self.function_format))
-
-        # Class definitions
-        self.highlighting_rules.append((QRegularExpression(r'\bclass\s+(\w+)'), self.class_format))
+        for format_name, char_format in _theme_formats(self.is_dark_mode).items():
+            setattr(self, format_name, char_format)
+
+        # Bind the shared, precompiled rules to this theme's formats
+        self.word_formats = {word: getattr(self, format_name)
+                             for words, format_name in _WORD_CLASSES for word in words}
+        self.token_formats = tuple(format_name and getattr(self, format_name)
+                                   for format_name in _TOKEN_FORMATS)
 
         self.tri_single_format = self.string_format
         self.tri_double_format = self.string_format
 
+    def set_theme(self, is_dark_mode):
+        """Switch to another theme's formats, carrying the block cache over to them"""
+        # Cached blocks keep their ranges and states; only the formats are
+        # swapped, so the following rehighlight replays instead of rescanning
+        old_formats = _theme_formats(self.is_dark_mode)
+        new_formats = _theme_formats(is_dark_mode)
+        replacements = {id(old_formats[name]): new_formats[name] for name in old_formats}
+        self.block_cache = {
+            key: (tuple((start, length, replacements[id(format_style)])
+                        for start, length, format_style in formats), state)
+            for key, (formats, state) in self.block_cache.items()
+        }
+        self.is_dark_mode = is_dark_mode
+        self.setup_formats()
+
     def highlightBlock(self, text):
         """Apply syntax highlighting to a block of text"""
+        previous_state = max(self.previousBlockState(), 0) & _TRIPLE_STATE_MASK
+        if not previous_state and (not text or text.isspace()):
+            # Blank lines outside a string have nothing to format
+            self.setCurrentBlockState(0)
+            return
 
-        self.setCurrentBlockState(0)
-
-        # FIX 1: Initialize flag to track if the multi-line string ended in this block
-        string_end_found = False
+        key = (previous_state, text)
+        cached = self.block_cache.get(key)
+        if cached is not None:
+            formats, state = cached
+            self.apply_formats(formats)
+            self.setCurrentBlockState(state)
+            return
 
-        # Check for continuation of triple-quoted strings
-        in_multiline = self.previousBlockState() == 1
+        self.recorded_formats = []
+        if self.force_full:
+            self.force_full = False
+        elif self.document().blockCount() > _LAZY_HIGHLIGHT_BLOCKS:
+            self.highlight_triple_quotes(text, previous_state)
+            self.setCurrentBlockState(self.currentBlockState() | _PENDING_STATE)
+            self.deferred = True
+            self.apply_formats(self.recorded_formats)
+            self.recorded_formats = None
+            return
 
-        if in_multiline:
-            end_index = text.find('"""')
-            if end_index == -1:
-                end_index = text.find("'''")
-
-            if end_index >= 0:
-                length = end_index + 3
-                self.setFormat(0, length, self.tri_double_format)
-                self.setCurrentBlockState(0)
-                # FIX 2: Set flag after terminating the multi-line string
-                string_end_found = True
-            else:
-                self.setFormat(0, len(text), self.tri_double_format)
-                self.setCurrentBlockState(1)
+        self.highlight_block(text, previous_state)
+        formats = tuple(self.recorded_formats)
+        self.recorded_formats = None
+        self.apply_formats(formats)
+        if len(self.block_cache) >= _BLOCK_CACHE_SIZE:
+            self.block_cache.clear()
+        self.block_cache[key] = (formats, self.currentBlockState())
+
+    def setFormat(self, start, length, format_style):
+        """Record a format for the block, extending the previous one when they touch"""
+        formats = self.recorded_formats
+        if formats:
+            last_start, last_length, last_format = formats[-1]
+            if last_format is format_style and last_start + last_length == start:
+                formats[-1] = (last_start, last_length + length, format_style)
                 return
+        formats.append((start, length, format_style))
+
+    def apply_formats(self, formats):
+        """Hand recorded (start, length, format) ranges to Qt in order"""
+        set_format = super().setFormat
+        for start, length, format_style in formats:
+            set_format(start, length, format_style)
+
+    def rehighlight(self):
+        """Highlight the whole document again, forgetting earlier deferrals"""
+        self.deferred = False
+        super().rehighlight()
+
+    def highlight_pending_block(self, block):
+        """Fully highlight a block whose highlighting was deferred"""
+        self.force_full = True
+        self.rehighlightBlock(block)
+        self.force_full = False
+
+    def highlight_triple_quotes(self, text, previous_state):
+        """Format triple-quoted strings and set the block state; return closed spans, or None if one stays open"""
+        self.setCurrentBlockState(0)
 
-        # FIX 3: Only look for the start of a NEW triple-quoted string if one hasn't just ended
-        if not string_end_found:
-            # Look for start of triple-quoted strings
-            for delimiter in ['"""', "'''"]:
-                start_index = text.find(delimiter)
-                if start_index >= 0:
-                    end_index = text.find(delimiter, start_index + 3)
-                    if end_index >= 0:
-                        length = end_index - start_index + 3
-                        self.setFormat(start_index, length, self.tri_double_format)
-                    else:
-                        self.setFormat(start_index, len(text) - start_index, self.tri_double_format)
-                        self.setCurrentBlockState(1)
-                        return
+        # Continue a string left open by the previous block, then walk the
+        # line opening and closing them in order
+        delimiter = _TRIPLE_DELIMITERS.get(previous_state)
+        start = search_from = 0
+        string_spans = []
+        while True:
+            if delimiter is None:
+                match = _TRIPLE_RE.search(text, search_from)
+                if match is None:
+                    break
+                start = match.start()
+                delimiter = match.group()
+                search_from = match.end()
+
+            end_index = text.find(delimiter, search_from)
+            if end_index == -1:
+                self.setFormat(start, len(text) - start, self.tri_double_format)
+                self.setCurrentBlockState(_TRIPLE_STATES[delimiter])
+                return None
+
+            search_from = end_index + 3
+            self.setFormat(start, search_from - start, self.tri_double_format)
+            string_spans.append((start, search_from))
+            delimiter = None
+        return string_spans
+
+    def highlight_block(self, text, previous_state):
+        """Highlight a block from scratch"""
+        string_spans = self.highlight_triple_quotes(text, previous_state)
+        if string_spans is None:
+            return
 
         # Handle single-line strings (including f-strings)
-        self.highlight_strings(text)
-
-        # Apply regular highlighting rules (after strings so keywords in strings aren't highlighted)
-        for pattern, format_style in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                start = match.capturedStart()
-                length = match.capturedLength()
-
-                # Don't override string formatting
-                current_format = self.format(start)
-                if (current_format.foreground().color() != self.string_format.foreground().color() or
-                        format_style == self.comment_format):
-                    self.setFormat(start, length, format_style)
-
-        # Apply comments last to override everything
-        comment_iterator = self.comment_pattern.globalMatch(text)
-        while comment_iterator.hasNext():
-            match = comment_iterator.next()
+        string_spans.extend(self.highlight_strings(text))
+        string_starts, string_ends = _merge_spans(string_spans)
+
+        # Comments, classes, functions, decorators, numbers, keywords, builtins, type
+        # hints and self in one pass (after strings so tokens in strings aren't highlighted)
+        token_formats = self.token_formats
+        word_formats = self.word_formats
+        match_iterator = _TOKEN_PATTERN.globalMatch(text)
+        while match_iterator.hasNext():
+            match = match_iterator.next()
+            group = match.lastCapturedIndex()
             start = match.capturedStart()
-            length = match.capturedLength()
-            self.setFormat(start, length, self.comment_format)
+            if group == _COMMENT_GROUP:
+                # Comments run to the end of the line and override everything
+                self.setFormat(start, match.capturedLength(), self.comment_format)
+                break
 
-    def highlight_strings(self, text):
-        """Highlight string literals including f-strings"""
-        i = 0
-        while i < len(text):
-            # Check for f-string
-            if i < len(text) - 1 and text[i] in 'fFrRbBuU':
-                prefix = text[i]
-                quote_char = text[i + 1] if i + 1 < len(text) else None
-
-                if quote_char in ['"', "'"]:
-                    start = i
-                    i += 2
-                    is_fstring = prefix in 'fF'
-
-                    while i < len(text):
-                        if text[i] == '\\' and i + 1 < len(text):
-                            i += 2
-                            continue
-                        elif text[i] == quote_char:
-                            self.setFormat(start, i - start + 1, self.string_format)
-
-                            if is_fstring:
-                                self.highlight_fstring_braces(text, start, i + 1)
-
-                            i += 1
-                            break
-                        i += 1
+            if group == _WORD_GROUP:
+                format_style = word_formats.get(match.captured(group))
+                if format_style is None:
                     continue
+            else:
+                format_style = token_formats[group]
 
-            # Regular strings
-            elif text[i] in ['"', "'"]:
-                quote_char = text[i]
-                start = i
-                i += 1
-
-                while i < len(text):
-                    if text[i] == '\\' and i + 1 < len(text):
-                        i += 2
-                        continue
-                    elif text[i] == quote_char:
-                        self.setFormat(start, i - start + 1, self.string_format)
-                        i += 1
-                        break
-                    i += 1
-                continue
+            if string_starts:
+                index = bisect_right(string_starts, start) - 1
+                if index >= 0 and start < string_ends[index]:
+                    continue
+            self.setFormat(start, match.capturedLength(), format_style)
+
+    def highlight_strings(self, text):
+        """Highlight string literals including f-strings, returning their spans"""
+        spans = []
+        for start, length, is_fstring in _scan_strings(text):
+            self.setFormat(start, length, self.string_format)
+            spans.append((start, start + length))
 
-            i += 1
+            if is_fstring:
+                self.highlight_fstring_braces(text, start, start + length)
+        return spans
 
     def highlight_fstring_braces(self, text, start, end):
         """Highlight braces in f-strings"""
-        i = start
-        while i < end:
-            if text[i] == '{' and (i + 1 >= end or text[i + 1] != '{'):
-                brace_start = i
-                depth = 1
-                i += 1
-
-                while i < end and depth > 0:
-                    if text[i] == '{':
-                        depth += 1
-                    elif text[i] == '}':
-                        depth -= 1
-                        if depth == 0:
-                            self.setFormat(brace_start, 1, self.fstring_brace_format)
-                            self.setFormat(i, 1, self.fstring_brace_format)
-                    i += 1
-                continue
-            elif text[i] == '}' and (i + 1 >= end or text[i + 1] != '}'):
-                self.setFormat(i, 1, self.fstring_brace_format)
-
-            i += 1
+        for position in _scan_fstring_braces(text, start, end):
+            self.setFormat(position, 1, self.fstring_brace_format)
 
 
 class LineNumberArea(QWidget):
@@ -529,10 +861,18 @@ class CodeEditor(QPlainTextEdit):
         super().__init__(parent)
 
         # Set font
-        font = QFont("Consolas", 10)
-        if not font.exactMatch():
-            font = QFont("Courier New", 10)
-        self.setFont(font)
+        self.setFont(QFont(_monospace_family(), 10))
+        # Line number gutter width, recomputed when the digit count or font changes
+        self._digit_width = self.fontMetrics().horizontalAdvance('9')
+        self._number_digits = 0
+        self._number_area_width = 0
+        # Line number labels by block number, grown as the document does, and
+        # the laid-out text and width of those painted so far
+        self._line_labels = []
+        self._static_labels = {}
+        # Last copy of the document text and the revision it was taken at
+        self._text = ''
+        self._text_revision = -1
 
         # Set tab behavior
         self.setTabStopDistance(40)  # 4 spaces equivalent
@@ -542,19 +882,20 @@ class CodeEditor(QPlainTextEdit):
         self.indent_size = 4
         self.auto_detect_indent = True
 
-        # Theme settings
+        # Theme settings; applying the theme also creates the highlighter
         self.is_dark_mode = True
+        self.highlighter = None
         self.load_theme_preference()
 
-        # Initialize highlighter
-        self.highlighter = PythonHighlighter(self.document(), self.is_dark_mode)
-
         # Setup line number area
         self.line_number_area = LineNumberArea(self)
 
         # Connect signals for line numbers
         self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
         self.updateRequest.connect(self.updateLineNumberAreaHelper)
+        # Blocks of long documents get their full highlighting once on screen
+        self._highlighting_visible = False
+        self.updateRequest.connect(self.highlight_visible_blocks)
         self.cursorPositionChanged.connect(lambda: self.line_number_area.update())
 
         # Set initial viewport margins
@@ -570,8 +911,19 @@ class CodeEditor(QPlainTextEdit):
         self.completion_model = QStringListModel()
         self.completer.setModel(self.completion_model)
 
-        # Update completions on text change
-        self.textChanged.connect(self.update_completions)
+        # Identifiers found in each block, indexed by block number, and how
+        # many blocks define each one; edits only rescan the blocks they touch
+        self._block_identifiers = [frozenset()]
+        # Name defined on each block, for jump to definition
+        self._block_definitions = [None]
+        self._identifier_counts = Counter()
+        self._completion_words = set()
+        self._sorted_completions = []
+        # Set when the identifiers changed; the list is only rebuilt when the
+        # completer is about to be shown
+        self._completions_dirty = False
+        self.document().contentsChange.connect(self.on_contents_change)
+        self.update_completions()
 
         # Track cursor position for status updates
         self.cursorPositionChanged.connect(self.on_cursor_position_changed)
@@ -585,22 +937,17 @@ class CodeEditor(QPlainTextEdit):
 
     def load_theme_preference(self):
         """Load theme preference from file"""
-        try:
-            with open('.microid_theme', 'r') as f:
-                theme = f.read().strip()
-                self.is_dark_mode = (theme == 'dark')
-                self.apply_theme()
-        except:
-            self.is_dark_mode = True
-            self.apply_theme()
+        self.is_dark_mode = _saved_dark_mode()
+        self.apply_theme()
 
     def save_theme_preference(self):
         """Save theme preference to file"""
-        try:
-            with open('.microid_theme', 'w') as f:
-                f.write('dark' if self.is_dark_mode else 'light')
-        except:
-            pass
+        # Replace the file atomically; failing to save the theme is not an error
+        save_file = QSaveFile(_THEME_FILE)
+        if save_file.open(QIODevice.WriteOnly):
+            save_file.write(b'dark' if self.is_dark_mode else b'light')
+            save_file.commit()
+        _saved_dark_mode.cache_clear()
 
     def apply_theme(self):
         """Apply current theme"""
@@ -609,8 +956,11 @@ class CodeEditor(QPlainTextEdit):
         else:
             self.setStyleSheet("background-color: #FFFFFF; color: #000000;")
 
-        # Reinitialize highlighter with current theme
-        self.highlighter = PythonHighlighter(self.document(), self.is_dark_mode)
+        # Switch the existing highlighter's formats rather than building a new one
+        if self.highlighter is None:
+            self.highlighter = PythonHighlighter(self.document(), self.is_dark_mode)
+        else:
+            self.highlighter.set_theme(self.is_dark_mode)
         self.highlighter.rehighlight()
 
     def toggle_theme(self):
@@ -621,24 +971,61 @@ class CodeEditor(QPlainTextEdit):
 
     def lineNumberAreaWidth(self):
         """Calculate width needed for line numbers"""
-        digits = 1
-        max_num = max(1, self.blockCount())
-        while max_num >= 10:
-            max_num //= 10
-            digits += 1
-
-        font_metrics = self.fontMetrics()
-        space = 3 + font_metrics.horizontalAdvance('9') * digits
-        return space
+        digits = len(str(self.blockCount()))
+        if digits != self._number_digits:
+            self._number_digits = digits
+            self._number_area_width = 3 + self._digit_width * digits
+        return self._number_area_width
+
+    def changeEvent(self, event):
+        """Remeasure the line number digits when the font changes"""
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self._digit_width = self.fontMetrics().horizontalAdvance('9')
+            self._number_digits = 0
+            self._static_labels = {}
+            self.updateLineNumberAreaWidth(0)
 
     def updateLineNumberAreaWidth(self, _):
         """Update viewport margins when line count changes"""
-        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+        # Setting margins relayouts the viewport even when they are unchanged
+        width = self.lineNumberAreaWidth()
+        if width != self.viewportMargins().left():
+            self.setViewportMargins(width, 0, 0, 0)
 
     def updateLineNumberAreaHelper(self, rect, dy):
         """Helper to connect updateRequest signal properly"""
         self.updateLineNumberArea(rect, dy)
 
+    def highlight_visible_blocks(self, rect=None, dy=0):
+        """Fully highlight the visible blocks the highlighter deferred"""
+        # Rehighlighting relayouts the block, which requests another update
+        if self.highlighter is None or self._highlighting_visible:
+            return
+        # Short documents are highlighted in full, so there is nothing to look for
+        # unless one just shrank below the limit with blocks still pending
+        if self.document().blockCount() <= _LAZY_HIGHLIGHT_BLOCKS:
+            if self.highlighter.deferred:
+                self._highlighting_visible = True
+                try:
+                    self.highlighter.rehighlight()
+                finally:
+                    self._highlighting_visible = False
+            return
+        self._highlighting_visible = True
+        try:
+            block = self.firstVisibleBlock()
+            top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+            bottom = self.viewport().rect().bottom()
+            while block.isValid() and top <= bottom:
+                state = block.userState()
+                if state != -1 and state & _PENDING_STATE:
+                    self.highlighter.highlight_pending_block(block)
+                top += self.blockBoundingRect(block).height()
+                block = block.next()
+        finally:
+            self._highlighting_visible = False
+
     def updateLineNumberArea(self, rect, dy):
         """Update line number area when editor scrolls"""
         if dy:
@@ -673,22 +1060,26 @@ class CodeEditor(QPlainTextEdit):
         bottom = top + self.blockBoundingRect(block).height()
 
         font_metrics = self.fontMetrics()
+        line_height = font_metrics.height()
+        area_width = self.lineNumberAreaWidth()
         current_block_number = self.textCursor().blockNumber()
+        line_labels = self._line_labels
+        static_labels = self._static_labels
+        if len(line_labels) < self.blockCount():
+            line_labels.extend(str(number) for number in range(len(line_labels) + 1, self.blockCount() + 1))
 
         while block.isValid() and top <= event.rect().bottom():
             if block.isVisible() and bottom >= event.rect().top():
-                number = str(block_number + 1)
+                number = line_labels[block_number]
 
                 # Highlight current line number
                 if block_number == current_block_number:
                     if self.is_dark_mode:
-                        painter.fillRect(0, int(top), self.lineNumberAreaWidth(),
-                                         font_metrics.height(),
+                        painter.fillRect(0, int(top), area_width, line_height,
                                          QColor("#3A3A3A"))
                         painter.setPen(QColor("#D4D4D4"))
                     else:
-                        painter.fillRect(0, int(top), self.lineNumberAreaWidth(),
-                                         font_metrics.height(),
+                        painter.fillRect(0, int(top), area_width, line_height,
                                          QColor("#E0E0E0"))
                         painter.setPen(QColor("#000000"))
                 else:
@@ -697,9 +1088,15 @@ class CodeEditor(QPlainTextEdit):
                     else:
                         painter.setPen(QColor("#999999"))
 
-                painter.drawText(0, int(top), self.lineNumberAreaWidth(),
-                                 font_metrics.height(),
-                                 Qt.AlignRight, number)
+                # Shape each label once and redraw the cached glyphs afterwards
+                label = static_labels.get(block_number)
+                if label is None:
+                    static_text = QStaticText(number)
+                    static_text.setTextFormat(Qt.PlainText)
+                    static_text.prepare(painter.transform(), painter.font())
+                    label = static_labels[block_number] = (static_text, round(static_text.size().width()))
+                static_text, text_width = label
+                painter.drawStaticText(area_width - text_width, int(top), static_text)
 
             block = block.next()
             top = bottom
@@ -712,26 +1109,11 @@ class CodeEditor(QPlainTextEdit):
 
     def detect_indentation(self):
         """Auto-detect indentation type from existing content"""
-        text = self.toPlainText()
-        lines = text.split('\n')
-
-        spaces_count = 0
-        tabs_count = 0
-        indent_sizes = []
-
-        for line in lines:
-            if not line.strip():
-                continue
-
-            leading_spaces = len(line) - len(line.lstrip(' '))
-            leading_tabs = len(line) - len(line.lstrip('\t'))
-
-            if leading_tabs > 0:
-                tabs_count += 1
-            elif leading_spaces > 0:
-                spaces_count += 1
-                if leading_spaces % 2 == 0:
-                    indent_sizes.append(leading_spaces)
+        # Leading tab or run of spaces of every non-blank line, in one regex pass
+        leads = _INDENT_RE.findall(self.plain_text())
+        tabs_count = leads.count('\t')
+        spaces_count = len(leads) - tabs_count
+        indent_sizes = [len(lead) for lead in leads if lead != '\t' and len(lead) % 2 == 0]
 
         if tabs_count > spaces_count:
             self.indent_type = "tabs"
@@ -739,20 +1121,30 @@ class CodeEditor(QPlainTextEdit):
         else:
             self.indent_type = "spaces"
             if indent_sizes:
-                from collections import Counter
                 size_diffs = []
                 sorted_sizes = sorted(set(indent_sizes))
                 for i in range(1, len(sorted_sizes)):
                     size_diffs.append(sorted_sizes[i] - sorted_sizes[i - 1])
 
                 if size_diffs:
-                    common_diff = Counter(size_diffs).most_common(1)[0][0]
-                    self.indent_size = common_diff
+                    # Most frequent step; ties go to the first seen, as with Counter.most_common
+                    counts = {}
+                    for diff in size_diffs:
+                        counts[diff] = counts.get(diff, 0) + 1
+                    self.indent_size = max(counts, key=counts.get)
                 else:
                     self.indent_size = 4
             else:
                 self.indent_size = 4
 
+    def plain_text(self):
+        """Return the document text, reusing the last copy while the document is unchanged"""
+        revision = self.document().revision()
+        if self._text_revision != revision:
+            self._text = self.toPlainText()
+            self._text_revision = revision
+        return self._text
+
     def get_line_indentation(self, line_text):
         """Get indentation level of a line"""
         if self.indent_type == "tabs":
@@ -761,56 +1153,79 @@ class CodeEditor(QPlainTextEdit):
             leading_spaces = len(line_text) - len(line_text.lstrip(' '))
             return leading_spaces // self.indent_size
 
-    def update_completions(self):
-        """Extract identifiers from code for autocomplete"""
-        code = self.toPlainText()
-        identifiers = set()
-
-        # Extract using regex for quick parsing
-        for match in re.finditer(r'\bdef\s+(\w+)', code):
-            identifiers.add(match.group(1))
-
-        for match in re.finditer(r'\bclass\s+(\w+)', code):
-            identifiers.add(match.group(1))
-
-        for match in re.finditer(r'\b([a-zA-Z_]\w*)\s*=', code):
-            identifiers.add(match.group(1))
-
-        for match in re.finditer(r'\bimport\s+(\w+)', code):
-            identifiers.add(match.group(1))
-
-        for match in re.finditer(r'\bfrom\s+\w+\s+import\s+(\w+)', code):
-            identifiers.add(match.group(1))
-
-        # Add Python keywords and builtins
-        keywords = ['def', 'class', 'if', 'elif', 'else', 'for', 'while', 'try',
-                    'except', 'finally', 'with', 'return', 'yield', 'import', 'from',
-                    'as', 'pass', 'break', 'continue', 'lambda', 'True', 'False',
-                    'None', 'and', 'or', 'not', 'in', 'is', 'async', 'await']
-
-        builtins = ['print', 'len', 'range', 'str', 'int', 'float', 'list', 'dict',
-                    'set', 'tuple', 'open', 'enumerate', 'zip', 'map', 'filter',
-                    'sum', 'min', 'max', 'abs', 'all', 'any', 'sorted', 'reversed',
-                    'isinstance', 'issubclass', 'hasattr', 'getattr', 'setattr']
+    def on_contents_change(self, position, removed, added):
+        """Rescan only the blocks touched by an edit for identifiers and definitions"""
+        document = self.document()
+        block_identifiers = self._block_identifiers
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(min(position + added, document.characterCount() - 1)).blockNumber()
+        old_last = last - (document.blockCount() - len(block_identifiers))
+
+        if first < 0 or last < first or old_last < first or old_last >= len(block_identifiers):
+            # Lost track of the block layout, rescan everything
+            first, last, old_last = 0, document.blockCount() - 1, len(block_identifiers) - 1
+
+        counts = self._identifier_counts
+        keys_changed = False
+        for identifiers in block_identifiers[first:old_last + 1]:
+            for identifier in identifiers:
+                counts[identifier] -= 1
+                if not counts[identifier]:
+                    del counts[identifier]
+                    keys_changed = True
+
+        rescanned = []
+        definitions = []
+        block = document.findBlockByNumber(first)
+        for _ in range(last - first + 1):
+            text = block.text()
+            definitions.append(_scan_definition(text))
+            identifiers = _scan_identifiers(text)
+            for identifier in identifiers:
+                if not counts[identifier]:
+                    keys_changed = True
+                counts[identifier] += 1
+            rescanned.append(identifiers)
+            block = block.next()
+        block_identifiers[first:old_last + 1] = rescanned
+        self._block_definitions[first:old_last + 1] = definitions
 
-        type_hints = [
-            'List', 'Dict', 'Set', 'Tuple', 'Optional', 'Union', 'Any', 'Callable',
-            'Iterable', 'Iterator', 'Sequence', 'Mapping', 'Type', 'TypeVar',
-            'Generic', 'Protocol', 'Literal', 'Final', 'ClassVar'
-        ]
+        if keys_changed:
+            self._completions_dirty = True
 
-        return_patterns = [
-            '-> None:', '-> str:', '-> int:', '-> float:', '-> bool:',
-            '-> list:', '-> dict:', '-> tuple:', '-> List[str]:', '-> List[int]:',
-            '-> Dict[str, Any]:', '-> Optional[str]:', '-> Optional[int]:',
-        ]
+    def update_completions(self):
+        """Rebuild the autocomplete list from the tracked identifiers"""
+        self._completions_dirty = False
+        identifiers = _STATIC_COMPLETIONS.union(self._identifier_counts)
 
-        identifiers.update(keywords)
-        identifiers.update(builtins)
-        identifiers.update(type_hints)
-        identifiers.update(return_patterns)
+        previous = self._completion_words
+        if identifiers == previous:
+            return
+        self._completion_words = identifiers
+
+        # Patch the cached sorted list instead of re-sorting everything
+        sorted_words = self._sorted_completions
+        removed = previous - identifiers
+        added = identifiers - previous
+        if len(removed) + len(added) > _COMPLETION_PATCH_LIMIT:
+            for word in removed:
+                del sorted_words[bisect_left(sorted_words, word)]
+            for word in added:
+                insort(sorted_words, word)
+            self.completion_model.setStringList(sorted_words)
+            return
 
-        self.completion_model.setStringList(sorted(identifiers))
+        # A few words changed, so move just those rows rather than resetting the model
+        model = self.completion_model
+        for word in removed:
+            row = bisect_left(sorted_words, word)
+            del sorted_words[row]
+            model.removeRows(row, 1)
+        for word in added:
+            row = bisect_left(sorted_words, word)
+            sorted_words.insert(row, word)
+            model.insertRows(row, 1)
+            model.setData(model.index(row), word)
 
     def insert_completion(self, completion):
         """Insert the selected completion"""
@@ -824,12 +1239,6 @@ class CodeEditor(QPlainTextEdit):
         cursor.insertText(completion)
         self.setTextCursor(cursor)
 
-    def text_under_cursor(self):
-        """Get the word under cursor for completion"""
-        cursor = self.textCursor()
-        cursor.select(QTextCursor.WordUnderCursor)
-        return cursor.selectedText()
-
     def create_indent_string(self, level):
         """Create indent string based on current settings"""
         if self.indent_type == "tabs":
@@ -920,23 +1329,22 @@ class CodeEditor(QPlainTextEdit):
                 event.ignore()
                 return
 
-        if self.auto_detect_indent and self.toPlainText():
+        if self.auto_detect_indent and not self.document().isEmpty():
             self.detect_indentation()
             self.auto_detect_indent = False
 
+        # One cursor serves every branch below; the block text stands in for
+        # selecting the line under it
         cursor = self.textCursor()
 
         if event.key() in (Qt.Key_Return, Qt.Key_Enter):
-            cursor = self.textCursor()
-            cursor.select(QTextCursor.LineUnderCursor)
-            current_line = cursor.selectedText()
+            current_line = cursor.block().text()
 
             indent_level = self.get_line_indentation(current_line)
             stripped_line = current_line.rstrip()
             if stripped_line.endswith(':'):
                 indent_level += 1
 
-            cursor = self.textCursor()
             super().keyPressEvent(event)
 
             indent_str = self.create_indent_string(indent_level)
@@ -945,7 +1353,6 @@ class CodeEditor(QPlainTextEdit):
             return
 
         elif event.key() == Qt.Key_Tab:
-            cursor = self.textCursor()
             if cursor.hasSelection():
                 # Indent selected lines
                 self.indent_selected_lines()
@@ -958,42 +1365,17 @@ class CodeEditor(QPlainTextEdit):
             return
 
         elif event.key() == Qt.Key_Backtab:
-            cursor = self.textCursor()
-            if cursor.hasSelection():
-                # Unindent selected lines
-                self.unindent_selected_lines()
-            else:
-                # Unindent current line
-                cursor.select(QTextCursor.LineUnderCursor)
-                line = cursor.selectedText()
-
-                if self.indent_type == "tabs":
-                    if line.startswith('\t'):
-                        cursor.movePosition(QTextCursor.StartOfLine)
-                        cursor.deleteChar()
-                else:
-                    spaces_to_remove = min(self.indent_size, len(line) - len(line.lstrip(' ')))
-                    for _ in range(spaces_to_remove):
-                        if cursor.position() < block.position() + block.length() - 1:
-                            char = self.document().characterAt(cursor.position())
-                            if char == ' ':
-                                cursor.deleteChar()
-                            else:
-                                break
-
+            # Unindent the selected lines, or the current one without a selection
+            self.unindent_selected_lines()
             return
 
         elif event.key() == Qt.Key_Backspace:
-            cursor = self.textCursor()
-            cursor.select(QTextCursor.LineUnderCursor)
-            line = cursor.selectedText()
-
-            pos = self.textCursor().positionInBlock()
+            line = cursor.block().text()
+            pos = cursor.positionInBlock()
 
             if pos > 0 and line[:pos].strip() == '':
                 if self.indent_type == "spaces" and pos >= self.indent_size:
                     if pos % self.indent_size == 0:
-                        cursor = self.textCursor()
                         for _ in range(self.indent_size):
                             cursor.deletePreviousChar()
                         return
@@ -1003,14 +1385,21 @@ class CodeEditor(QPlainTextEdit):
         if event.text() == ':' or event.text() == ')':
             self.check_type_hint_insertion()
 
+        # Read the prefix and the next character straight from the block text
         cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor)
-        if cursor.selectedText().strip():
+        line = cursor.block().text()
+        pos = cursor.positionInBlock()
+        if line[pos:pos + 1].strip():
             self.completer.popup().hide()
             return
 
-        completion_prefix = self.text_under_cursor()
+        start = pos
+        while start and (line[start - 1].isalnum() or line[start - 1] == '_'):
+            start -= 1
+        completion_prefix = line[start:pos]
         if len(completion_prefix) >= 2:
+            if self._completions_dirty:
+                self.update_completions()
             if completion_prefix != self.completer.completionPrefix():
                 self.completer.setCompletionPrefix(completion_prefix)
                 popup = self.completer.popup()
@@ -1045,14 +1434,14 @@ class CodeEditor(QPlainTextEdit):
         cursor.setPosition(end)
         end_block = cursor.blockNumber()
 
-        # Indent each line
+        # Indent each line, walking the blocks instead of looking each one up
+        indent = '\t' if self.indent_type == "tabs" else ' ' * self.indent_size
+        block = self.document().findBlockByNumber(start_block)
         cursor.beginEditBlock()
-        for block_num in range(start_block, end_block + 1):
-            cursor.setPosition(self.document().findBlockByNumber(block_num).position())
-            if self.indent_type == "tabs":
-                cursor.insertText('\t')
-            else:
-                cursor.insertText(' ' * self.indent_size)
+        for _ in range(end_block - start_block + 1):
+            cursor.setPosition(block.position())
+            cursor.insertText(indent)
+            block = block.next()
         cursor.endEditBlock()
 
     def unindent_selected_lines(self):
@@ -1070,24 +1459,21 @@ class CodeEditor(QPlainTextEdit):
         cursor.setPosition(end)
         end_block = cursor.blockNumber()
 
-        # Unindent each line
+        # Unindent each line, removing its leading indent in one deletion
+        block = self.document().findBlockByNumber(start_block)
         cursor.beginEditBlock()
-        for block_num in range(start_block, end_block + 1):
-            block = self.document().findBlockByNumber(block_num)
-            cursor.setPosition(block.position())
+        for _ in range(end_block - start_block + 1):
             line_text = block.text()
+            if self.indent_type == "tabs":
+                remove = 1 if line_text.startswith('\t') else 0
+            else:
+                remove = min(self.indent_size, len(line_text) - len(line_text.lstrip(' ')))
 
-            if self.indent_type == "tabs" and line_text.startswith('\t'):
-                cursor.deleteChar()
-            elif self.indent_type == "spaces":
-                spaces_to_remove = min(self.indent_size, len(line_text) - len(line_text.lstrip(' ')))
-                for _ in range(spaces_to_remove):
-                    if cursor.position() < block.position() + block.length() - 1:
-                        char = self.document().characterAt(cursor.position())
-                        if char == ' ':
-                            cursor.deleteChar()
-                        else:
-                            break
+            if remove:
+                cursor.setPosition(block.position())
+                cursor.setPosition(block.position() + remove, QTextCursor.KeepAnchor)
+                cursor.removeSelectedText()
+            block = block.next()
         cursor.endEditBlock()
 
     def check_type_hint_insertion(self):
@@ -1096,7 +1482,8 @@ class CodeEditor(QPlainTextEdit):
         cursor.select(QTextCursor.LineUnderCursor)
         line = cursor.selectedText()
 
-        if re.match(r'^\s*def\s+\w+\([^)]*\)\s*:\s*$', line):
+        # Cheap prefix reject before running the regex on every ':' or ')'
+        if line.lstrip().startswith('def') and _DEF_LINE_RE.match(line):
             if '->' not in line:
                 cursor = self.textCursor()
                 block_text = cursor.block().text()
@@ -1130,7 +1517,7 @@ class CodeEditor(QPlainTextEdit):
             cursor.select(QTextCursor.WordUnderCursor)
             word = cursor.selectedText()
 
-            if word and re.match(r'^[a-zA-Z_]\w*$', word):
+            if word.isidentifier():
                 self.viewport().setCursor(Qt.PointingHandCursor)
             else:
                 self.viewport().setCursor(Qt.IBeamCursor)
@@ -1147,23 +1534,12 @@ class CodeEditor(QPlainTextEdit):
 
     def jump_to_definition(self, identifier):
         """Jump to the definition of a function or class"""
-        code = self.toPlainText()
-        lines = code.split('\n')
-
-        patterns = [
-            rf'^\s*def\s+{re.escape(identifier)}\s*\(',
-            rf'^\s*class\s+{re.escape(identifier)}\s*[\(:]',
-            rf'^\s*{re.escape(identifier)}\s*=',
-        ]
-
-        for line_num, line in enumerate(lines):
-            for pattern in patterns:
-                if re.search(pattern, line):
-                    cursor = QTextCursor(self.document().findBlockByLineNumber(line_num))
-                    self.setTextCursor(cursor)
-                    self.centerCursor()
-                    self.highlight_line(line_num)
-                    return
+        try:
+            line_num = self._block_definitions.index(identifier)
+        except ValueError:
+            return
+
+        self.jump_to_line(line_num)
 
     def jump_to_line(self, line_num):
         """Jump to a specific line number (0-based)"""
@@ -1237,10 +1613,7 @@ class OutputConsole(QTextEdit):
         self.is_dark_mode = True
 
         # Set dark theme
-        font = QFont("Consolas", 9)
-        if not font.exactMatch():
-            font = QFont("Courier New", 9)
-        self.setFont(font)
+        self.setFont(QFont(_monospace_family(), 9))
         self.apply_theme()
 
     def apply_theme(self):
@@ -1270,7 +1643,7 @@ class OutputConsole(QTextEdit):
 
             # Parse line number from error message
             # Look for patterns like "line 123," or "line 123,"
-            match = re.search(r'line\s+(\d+)', line_text)
+            match = _LINE_REF_RE.search(line_text)
             if match:
                 line_num = int(match.group(1))
                 # Jump to that line in the editor (convert to 0-based)
@@ -1289,7 +1662,7 @@ class OutputConsole(QTextEdit):
             line_text = cursor.selectedText()
 
             # Check if this line contains a line number reference
-            if re.search(r'line\s+\d+', line_text):
+            if _LINE_REF_RE.search(line_text):
                 self.viewport().setCursor(Qt.PointingHandCursor)
             else:
                 self.viewport().setCursor(Qt.IBeamCursor)
@@ -1299,6 +1672,16 @@ class OutputConsole(QTextEdit):
         super().mouseMoveEvent(event)
 
 
+@lru_cache(maxsize=32)
+def _search_regex(pattern, case_sensitive):
+    """Compile a find/replace pattern once, so repeated searches reuse the JIT code"""
+    regex = QRegularExpression(pattern)
+    if not case_sensitive:
+        regex.setPatternOptions(QRegularExpression.CaseInsensitiveOption)
+    regex.optimize()
+    return regex
+
+
 class FindDialog(QDialog):
     """Find and Replace dialog"""
 
@@ -1376,6 +1759,13 @@ class FindDialog(QDialog):
             flags |= QTextDocument.FindWholeWords
         return flags
 
+    def search_query(self):
+        """Return the search text, or its compiled pattern in regex mode"""
+        search_text = self.find_input.text()
+        if self.use_regex.isChecked():
+            return _search_regex(search_text, self.case_sensitive.isChecked())
+        return search_text
+
     def find_next(self):
         """Find next occurrence"""
         search_text = self.find_input.text()
@@ -1384,25 +1774,14 @@ class FindDialog(QDialog):
             return
 
         cursor = self.editor.textCursor()
-
-        if self.use_regex.isChecked():
-            regex = QRegularExpression(search_text)
-            if not self.case_sensitive.isChecked():
-                regex.setPatternOptions(QRegularExpression.CaseInsensitiveOption)
-            found_cursor = self.editor.document().find(regex, cursor, self.get_search_flags())
-        else:
-            found_cursor = self.editor.document().find(search_text, cursor, self.get_search_flags())
+        query = self.search_query()
+        flags = self.get_search_flags()
+        found_cursor = self.editor.document().find(query, cursor, flags)
 
         if found_cursor.isNull():
             # Wrap around to beginning
             cursor.movePosition(QTextCursor.Start)
-            if self.use_regex.isChecked():
-                regex = QRegularExpression(search_text)
-                if not self.case_sensitive.isChecked():
-                    regex.setPatternOptions(QRegularExpression.CaseInsensitiveOption)
-                found_cursor = self.editor.document().find(regex, cursor, self.get_search_flags())
-            else:
-                found_cursor = self.editor.document().find(search_text, cursor, self.get_search_flags())
+            found_cursor = self.editor.document().find(query, cursor, flags)
 
             if found_cursor.isNull():
                 self.status_label.setText("Not found")
@@ -1432,14 +1811,7 @@ class FindDialog(QDialog):
         flags |= QTextDocument.FindBackward
 
         cursor = self.editor.textCursor()
-
-        if self.use_regex.isChecked():
-            regex = QRegularExpression(search_text)
-            if not self.case_sensitive.isChecked():
-                regex.setPatternOptions(QRegularExpression.CaseInsensitiveOption)
-            found_cursor = self.editor.document().find(regex, cursor, flags)
-        else:
-            found_cursor = self.editor.document().find(search_text, cursor, flags)
+        found_cursor = self.editor.document().find(self.search_query(), cursor, flags)
 
         if found_cursor.isNull():
             # Wrap around to end
@@ -1483,17 +1855,11 @@ class FindDialog(QDialog):
         self.editor.setTextCursor(cursor)
 
         count = 0
+        query = self.search_query()
         flags = self.get_search_flags()
 
         while True:
-            if self.use_regex.isChecked():
-                regex = QRegularExpression(search_text)
-                if not self.case_sensitive.isChecked():
-                    regex.setPatternOptions(QRegularExpression.CaseInsensitiveOption)
-                found_cursor = self.editor.document().find(regex, cursor, flags)
-            else:
-                found_cursor = self.editor.document().find(search_text, cursor, flags)
-
+            found_cursor = self.editor.document().find(query, cursor, flags)
             if found_cursor.isNull():
                 break
 
@@ -1518,6 +1884,41 @@ class FindDialog(QDialog):
             self.editor.viewport().setCursor(Qt.IBeamCursor)
 
 
+# Output console colors and the rule drawn around each run
+_OUTPUT_TEXT = "#D4D4D4"
+_OUTPUT_MUTED = "#808080"
+_OUTPUT_OK = "#6A8759"
+_OUTPUT_ERROR = "#FF6B6B"
+_OUTPUT_INFO = "#6897BB"
+_OUTPUT_WARNING = "#FFC66D"
+_OUTPUT_SEPARATOR = "=" * 50
+
+
+# Toolbar layout as (attribute, text, shortcut, slot), None for a separator;
+# actions with an attribute are kept on the window for later updates
+_TOOLBAR_ACTIONS = (
+    (None, "New", "Ctrl+N", 'new_file'),
+    (None, "Open", "Ctrl+O", 'open_file'),
+    (None, "Save", "Ctrl+S", 'save_file'),
+    (None, "Save As", "Ctrl+Shift+S", 'save_file_as'),
+    None,
+    ('run_action', "▶ Run", "F5", 'run_code'),
+    (None, "✓ Validate", "F6", 'validate_syntax'),
+    None,
+    ('venv_action', "🐍 Venv: None", None, 'manage_venv'),
+    None,
+    (None, "Find", "Ctrl+F", 'show_find_dialog'),
+    (None, "Go to Line", "Ctrl+G", 'go_to_line'),
+    None,
+    ('theme_action', "🌙 Dark Mode", None, 'toggle_theme'),
+    None,
+    ('indent_action', "Indent: Spaces (4)", None, 'toggle_indent_type'),
+    (None, "Clear Output", None, 'clear_output'),
+    None,
+    (None, "Add typing import", None, 'add_typing_import'),
+)
+
+
 class PythonEditor(QMainWindow):
     """Main editor window"""
 
@@ -1525,12 +1926,44 @@ class PythonEditor(QMainWindow):
         super().__init__()
 
         self.current_file = None
-        self.process = None
+        # One process object runs the code every time
+        self.process = QProcess(self)
+        self.process.setProcessChannelMode(QProcess.SeparateChannels)
+        self.process.readyReadStandardOutput.connect(self.handle_stdout)
+        self.process.readyReadStandardError.connect(self.handle_stderr)
+        self.process.finished.connect(self.handle_finished)
+        self.process.errorOccurred.connect(self.handle_process_error)
         self.find_dialog = None
         self.active_venv = None
+        # Temp file the code is written to for each run, created on first use
+        self._temp_fd = None
+        self._temp_path = None
+        # Recently parsed sources mapped to their code object or SyntaxError, oldest first
+        self._parse_cache = OrderedDict()
+        # Document revision that last parsed without errors
+        self._last_valid_rev = -1
+        # Syntax validation parses on the global thread pool; idle parses
+        # only warm the cache and are not reported
+        self._parse_signals = _ParseSignals(self)
+        self._parse_signals.finished.connect(self.on_parse_done)
+        self._idle_parse_signals = _ParseSignals(self)
+        self._idle_parse_signals.finished.connect(self.store_parse_result)
         self.load_venv_preference()
         self.init_ui()
 
+        # Console character formats, one per output color
+        self._output_formats = {}
+
+        # Process output is decoded as it arrives and queued as [text, color]
+        # runs, then flushed to the console at most once per frame
+        self._stdout_decoder = None
+        self._stderr_decoder = None
+        self._pending_output = []
+        self.output_timer = QTimer(self)
+        self.output_timer.setSingleShot(True)
+        self.output_timer.setInterval(16)
+        self.output_timer.timeout.connect(self.flush_output)
+
         # Enable drag and drop on main window
         self.setAcceptDrops(True)
 
@@ -1555,11 +1988,7 @@ class PythonEditor(QMainWindow):
     def get_python_executable(self):
         """Get the Python executable to use (venv or system)"""
         if self.active_venv:
-            if sys.platform == "win32":
-                python_exe = os.path.join(self.active_venv, "Scripts", "python.exe")
-            else:
-                python_exe = os.path.join(self.active_venv, "bin", "python")
-
+            python_exe = _venv_python(self.active_venv)
             if os.path.exists(python_exe):
                 return python_exe
 
@@ -1576,6 +2005,8 @@ class PythonEditor(QMainWindow):
         # Create editor
         self.editor = CodeEditor()
         splitter.addWidget(self.editor)
+        # The editor keeps one document for its lifetime
+        self._doc = self.editor.document()
 
         # Create output console with error navigation
         self.output = OutputConsole(self.editor)
@@ -1587,107 +2018,51 @@ class PythonEditor(QMainWindow):
         self.setCentralWidget(splitter)
 
         # Track modifications
-        self.editor.document().modificationChanged.connect(self.on_modification_changed)
-
-        # Track cursor position and text changes for statistics
-        self.editor.cursorPositionChanged.connect(self.update_status_bar)
-        self.editor.textChanged.connect(self.update_status_bar)
+        self._doc.modificationChanged.connect(self.on_modification_changed)
+
+        # Track cursor position and text changes for statistics, refreshing
+        # the status bar once a burst of keystrokes has settled
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.setInterval(40)
+        self.status_timer.timeout.connect(self.refresh_status_bar)
+        self.editor.cursorPositionChanged.connect(self.status_timer.start)
+        self.editor.textChanged.connect(self.status_timer.start)
+
+        # Parse in the background once typing pauses, so Validate and Run
+        # usually find the current text already checked
+        self.idle_parse_timer = QTimer(self)
+        self.idle_parse_timer.setSingleShot(True)
+        self.idle_parse_timer.setInterval(500)
+        self.idle_parse_timer.timeout.connect(self.idle_parse)
+        self.editor.textChanged.connect(self.idle_parse_timer.start)
 
         # Create toolbar
         toolbar = QToolBar()
         self.addToolBar(toolbar)
 
-        # New file action
-        new_action = QAction("New", self)
-        new_action.setShortcut("Ctrl+N")
-        new_action.triggered.connect(self.new_file)
-        toolbar.addAction(new_action)
-
-        # Open file action
-        open_action = QAction("Open", self)
-        open_action.setShortcut("Ctrl+O")
-        open_action.triggered.connect(self.open_file)
-        toolbar.addAction(open_action)
-
-        # Save file action
-        save_action = QAction("Save", self)
-        save_action.setShortcut("Ctrl+S")
-        save_action.triggered.connect(self.save_file)
-        toolbar.addAction(save_action)
-
-        # Save As action
-        save_as_action = QAction("Save As", self)
-        save_as_action.setShortcut("Ctrl+Shift+S")
-        save_as_action.triggered.connect(self.save_file_as)
-        toolbar.addAction(save_as_action)
-
-        toolbar.addSeparator()
-
-        # Run code action
-        run_action = QAction("▶ Run", self)
-        run_action.setShortcut("F5")
-        run_action.triggered.connect(self.run_code)
-        toolbar.addAction(run_action)
-
-        # Validate syntax action
-        validate_action = QAction("✓ Validate", self)
-        validate_action.setShortcut("F6")
-        validate_action.triggered.connect(self.validate_syntax)
-        toolbar.addAction(validate_action)
-
-        toolbar.addSeparator()
-
-        # Virtual Environment action
-        self.venv_action = QAction("🐍 Venv: None", self)
-        self.venv_action.triggered.connect(self.manage_venv)
-        toolbar.addAction(self.venv_action)
+        for entry in _TOOLBAR_ACTIONS:
+            if entry is None:
+                toolbar.addSeparator()
+                continue
+            attribute, text, shortcut, slot = entry
+            action = QAction(text, self)
+            if shortcut:
+                action.setShortcut(shortcut)
+            action.triggered.connect(getattr(self, slot))
+            toolbar.addAction(action)
+            if attribute:
+                setattr(self, attribute, action)
         self.update_venv_button()
-
-        toolbar.addSeparator()
-
-        # Find action
-        find_action = QAction("Find", self)
-        find_action.setShortcut("Ctrl+F")
-        find_action.triggered.connect(self.show_find_dialog)
-        toolbar.addAction(find_action)
-
-        # Go to line action
-        goto_action = QAction("Go to Line", self)
-        goto_action.setShortcut("Ctrl+G")
-        goto_action.triggered.connect(self.go_to_line)
-        toolbar.addAction(goto_action)
-
-        toolbar.addSeparator()
-
-        # Theme toggle action
-        self.theme_action = QAction("🌙 Dark Mode", self)
-        self.theme_action.triggered.connect(self.toggle_theme)
-        toolbar.addAction(self.theme_action)
         self.update_theme_button()
 
-        toolbar.addSeparator()
-
-        # Indent type toggle with state display
-        self.indent_action = QAction("Indent: Spaces (4)", self)
-        self.indent_action.triggered.connect(self.toggle_indent_type)
-        toolbar.addAction(self.indent_action)
-
-        # Clear output action
-        clear_action = QAction("Clear Output", self)
-        clear_action.triggered.connect(self.clear_output)
-        toolbar.addAction(clear_action)
-
-        toolbar.addSeparator()
-
-        # Add typing import action
-        typing_action = QAction("Add typing import", self)
-        typing_action.triggered.connect(self.add_typing_import)
-        toolbar.addAction(typing_action)
-
         # Status bar
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
-        self.update_status_bar()
+        # Permanent label: setText only schedules a repaint, unlike showMessage
+        self.status_label = QLabel()
+        self.statusBar.addPermanentWidget(self.status_label, 1)
+        self.refresh_status_bar()
 
     def manage_venv(self):
         """Open virtual environment manager dialog"""
@@ -1698,9 +2073,9 @@ class PythonEditor(QMainWindow):
             self.update_venv_button()
 
             if self.active_venv:
-                self.append_output(f"Activated virtual environment: {self.active_venv}", "#6A8759")
+                self.append_output(f"Activated virtual environment: {self.active_venv}", _OUTPUT_OK)
             else:
-                self.append_output("Deactivated virtual environment", "#FFC66D")
+                self.append_output("Deactivated virtual environment", _OUTPUT_WARNING)
 
     def update_venv_button(self):
         """Update venv button text"""
@@ -1719,16 +2094,22 @@ class PythonEditor(QMainWindow):
             title += f" - {self.current_file}"
         if changed:
             title += " *"
-        self.setWindowTitle(title)
+        if title != self.windowTitle():
+            self.setWindowTitle(title)
 
     def update_status_bar(self):
+        """Schedule a status bar refresh"""
+        self.status_timer.start()
+
+    def refresh_status_bar(self):
         """Update status bar and indent button with current settings"""
         cursor = self.editor.textCursor()
         line = cursor.blockNumber() + 1
         col = cursor.columnNumber() + 1
 
-        total_lines = self.editor.document().blockCount()
-        total_chars = len(self.editor.toPlainText())
+        total_lines = self._doc.blockCount()
+        # Count without copying the text out; the final paragraph separator is not a character
+        total_chars = self._doc.characterCount() - 1
 
         indent_info = f"{self.editor.indent_type.capitalize()} ({self.editor.indent_size})"
 
@@ -1738,12 +2119,15 @@ class PythonEditor(QMainWindow):
             venv_info = f" | Venv: {venv_name}"
 
         status = f"Line {line}/{total_lines} | Col {col} | {total_chars} chars | Indent: {indent_info}{venv_info}"
-        self.statusBar.showMessage(status)
+        if status != self.status_label.text():
+            self.status_label.setText(status)
 
         if self.editor.indent_type == "spaces":
-            self.indent_action.setText(f"Indent: Spaces ({self.editor.indent_size})")
+            indent_text = f"Indent: Spaces ({self.editor.indent_size})"
         else:
-            self.indent_action.setText("Indent: Tabs")
+            indent_text = "Indent: Tabs"
+        if indent_text != self.indent_action.text():
+            self.indent_action.setText(indent_text)
 
     def show_find_dialog(self):
         """Show the find/replace dialog"""
@@ -1790,44 +2174,27 @@ class PythonEditor(QMainWindow):
 
     def add_typing_import(self):
         """Add 'from typing import' statement at top of file"""
-        code = self.editor.toPlainText()
-
-        if re.search(r'from\s+typing\s+import', code):
-            self.append_output("Typing import already exists", "#FFC66D")
+        # Both lookups read the document in place instead of copying it out
+        if not self._doc.find(_TYPING_RE).isNull():
+            self.append_output("Typing import already exists", _OUTPUT_WARNING)
             return
 
-        typing_imports = "from typing import List, Dict, Optional, Union, Any, Tuple, Set, Callable"
-
-        lines = code.split('\n')
-        insert_line = 0
-
-        in_docstring = False
-        for i, line in enumerate(lines):
-            if i == 0 and line.startswith('#!'):
-                insert_line = i + 1
-                continue
-
-            if '"""' in line or "'''" in line:
-                in_docstring = not in_docstring
-                if not in_docstring:
-                    insert_line = i + 1
-                continue
-
-            if in_docstring:
-                continue
-
-            if line.strip().startswith('import ') or line.strip().startswith('from '):
-                insert_line = i + 1
-            elif line.strip() and not line.strip().startswith('#'):
-                break
+        # Insert after the module docstring and the imports that open the file
+        insert_line = _import_insert_line(_document_lines(self._doc))
 
-        lines.insert(insert_line, typing_imports)
-        self.editor.setPlainText('\n'.join(lines))
-        self.append_output("Added typing imports", "#6A8759")
+        # Edit in place so undo history and highlighting of other lines survive
+        cursor = QTextCursor(self._doc)
+        if insert_line < self._doc.blockCount():
+            cursor.setPosition(self._doc.findBlockByNumber(insert_line).position())
+            cursor.insertText(_TYPING_IMPORT_LINE + '\n')
+        else:
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText('\n' + _TYPING_IMPORT_LINE)
+        self.append_output("Added typing imports", _OUTPUT_OK)
 
     def go_to_line(self):
         """Open dialog to go to a specific line"""
-        total_lines = self.editor.document().blockCount()
+        total_lines = self._doc.blockCount()
         current_line = self.editor.textCursor().blockNumber() + 1
 
         line_num, ok = QInputDialog.getInt(
@@ -1841,116 +2208,250 @@ class PythonEditor(QMainWindow):
         )
 
         if ok:
-            cursor = QTextCursor(self.editor.document().findBlockByLineNumber(line_num - 1))
+            cursor = QTextCursor(self._doc.findBlockByLineNumber(line_num - 1))
             self.editor.setTextCursor(cursor)
             self.editor.centerCursor()
             self.editor.highlight_line(line_num - 1)
 
-    def append_output(self, text, color="#D4D4D4"):
+    def append_output(self, text, color=_OUTPUT_TEXT):
         """Append text to output console with optional color"""
-        self.output.setTextColor(QColor(color))
-        self.output.append(text)
-        self.output.setTextColor(QColor("#D4D4D4"))
+        if not self.output.document().isEmpty():
+            text = '\n' + text
+        self.write_output(text, color)
+
+    def write_output(self, text, color):
+        """Insert text as-is at the end of the output console"""
+        text_format = self._output_formats.get(color)
+        if text_format is None:
+            text_format = QTextCharFormat()
+            text_format.setForeground(QColor(color))
+            self._output_formats[color] = text_format
+
+        # One plain-text insertion at the end; follow the output only if the
+        # console was already scrolled to the bottom, as append() did
+        scroll_bar = self.output.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+        cursor = QTextCursor(self.output.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text, text_format)
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def parse_code(self, code):
+        """Compile code to check it, reusing the result for recently parsed sources"""
+        key = _source_key(code)
+        try:
+            result = self._parse_cache[key]
+            self._parse_cache.move_to_end(key)
+        except KeyError:
+            try:
+                result = _compile_source(code)
+            except SyntaxError as e:
+                result = e
+            self.cache_parse_result(key, result)
+
+        if isinstance(result, SyntaxError):
+            raise result.with_traceback(None)
+        return result
+
+    def cache_parse_result(self, key, result):
+        """Store a code object or SyntaxError, dropping the oldest entry when full"""
+        self._parse_cache[key] = result
+        if len(self._parse_cache) > _PARSE_CACHE_SIZE:
+            self._parse_cache.popitem(last=False)
 
     def validate_syntax(self):
         """Validate Python syntax without running"""
-        code = self.editor.toPlainText()
+        code = self.editor.plain_text()
 
         if not code.strip():
-            self.append_output("No code to validate.", "#FFC66D")
+            self.append_output("No code to validate.", _OUTPUT_WARNING)
             return
 
-        self.append_output("=" * 50, "#808080")
-        self.append_output("Validating syntax...", "#6897BB")
-
-        try:
-            ast.parse(code)
-            self.append_output("✓ Syntax is valid!", "#6A8759")
-        except SyntaxError as e:
-            self.append_output(f"✗ Syntax Error:", "#FF6B6B")
-            self.append_output(f"  Line {e.lineno}: {e.msg}", "#FF6B6B")
+        self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
+        self.append_output("Validating syntax...", _OUTPUT_INFO)
+
+        # Unchanged code is answered from the cache, anything else is parsed
+        # on the thread pool and reported when the job finishes
+        key = _source_key(code)
+        revision = self._doc.revision()
+        result = self._parse_cache.get(key)
+        if result is not None:
+            self._parse_cache.move_to_end(key)
+            self.on_parse_done(key, revision, result)
+        else:
+            job = _ParseJob(code, key, revision, self._parse_signals)
+            QThreadPool.globalInstance().start(job)
+
+    def idle_parse(self):
+        """Parse the current text on the thread pool without reporting it"""
+        code = self.editor.plain_text()
+        key = _source_key(code)
+        if code.strip() and key not in self._parse_cache:
+            job = _ParseJob(code, key, self._doc.revision(), self._idle_parse_signals)
+            QThreadPool.globalInstance().start(job)
+
+    def store_parse_result(self, key, revision, result):
+        """Cache the result of a background parse"""
+        if isinstance(result, types.CodeType):
+            self._last_valid_rev = revision
+        if isinstance(result, (types.CodeType, SyntaxError)):
+            self.cache_parse_result(key, result)
+
+    def on_parse_done(self, key, revision, result):
+        """Cache and report the result of a syntax validation parse"""
+        self.store_parse_result(key, revision, result)
+        self.report_syntax(result)
+
+    def report_syntax(self, result):
+        """Write a validation result to the output console"""
+        if isinstance(result, SyntaxError):
+            e = result
+            self.append_output(f"✗ Syntax Error:", _OUTPUT_ERROR)
+            self.append_output(f"  Line {e.lineno}: {e.msg}", _OUTPUT_ERROR)
             if e.text:
-                self.append_output(f"  {e.text.rstrip()}", "#FFC66D")
+                self.append_output(f"  {e.text.rstrip()}", _OUTPUT_WARNING)
                 if e.offset:
-                    self.append_output(f"  {' ' * (e.offset - 1)}^", "#FF6B6B")
-        except Exception as e:
-            self.append_output(f"✗ Error: {str(e)}", "#FF6B6B")
+                    self.append_output(f"  {' ' * (e.offset - 1)}^", _OUTPUT_ERROR)
+        elif isinstance(result, Exception):
+            self.append_output(f"✗ Error: {str(result)}", _OUTPUT_ERROR)
+        else:
+            self.append_output("✓ Syntax is valid!", _OUTPUT_OK)
 
-        self.append_output("=" * 50, "#808080")
+        self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
 
     def run_code(self):
         """Execute the Python code"""
-        code = self.editor.toPlainText()
+        if self.process.state() != QProcess.NotRunning:
+            self.append_output("Code is already running.", _OUTPUT_WARNING)
+            return
+
+        code = self.editor.plain_text()
 
         if not code.strip():
-            self.append_output("No code to run.", "#FFC66D")
+            self.append_output("No code to run.", _OUTPUT_WARNING)
             return
 
-        try:
-            ast.parse(code)
-        except SyntaxError as e:
-            self.append_output("=" * 50, "#808080")
-            self.append_output("Cannot run - Syntax Error:", "#FF6B6B")
-            self.append_output(f"  Line {e.lineno}: {e.msg}", "#FF6B6B")
-            self.append_output("=" * 50, "#808080")
-            return
+        # An unedited document that already parsed cleanly is not parsed again
+        revision = self._doc.revision()
+        if revision != self._last_valid_rev:
+            try:
+                self.parse_code(code)
+            except SyntaxError as e:
+                self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
+                self.append_output("Cannot run - Syntax Error:", _OUTPUT_ERROR)
+                self.append_output(f"  Line {e.lineno}: {e.msg}", _OUTPUT_ERROR)
+                self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
+                return
+            self._last_valid_rev = revision
 
         python_exe = self.get_python_executable()
 
-        self.append_output("=" * 50, "#808080")
+        self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
         if self.active_venv:
             venv_name = os.path.basename(self.active_venv)
-            self.append_output(f"Running code with venv: {venv_name}...", "#6897BB")
+            self.append_output(f"Running code with venv: {venv_name}...", _OUTPUT_INFO)
         else:
-            self.append_output("Running code...", "#6897BB")
-        self.append_output(f"Python: {python_exe}", "#808080")
-        self.append_output("", "#D4D4D4")
+            self.append_output("Running code...", _OUTPUT_INFO)
+        self.append_output(f"Python: {python_exe}", _OUTPUT_MUTED)
+        # A blank line, then an empty one for the process output to stream into
+        self.append_output("\n", _OUTPUT_TEXT)
 
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
+            temp_file = self.write_temp_file(code)
 
-            self.process = QProcess(self)
-            self.process.readyReadStandardOutput.connect(self.handle_stdout)
-            self.process.readyReadStandardError.connect(self.handle_stderr)
-            self.process.finished.connect(lambda: self.handle_finished(temp_file))
+            self._stdout_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            self._stderr_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
 
-            self.process.start(python_exe, [temp_file])
+            # Unbuffered, so output streams in as the script prints instead of in 8 KiB blocks
+            self.run_action.setEnabled(False)
+            self.process.start(python_exe, ['-u', temp_file])
 
         except Exception as e:
-            self.append_output(f"Error running code: {str(e)}", "#FF6B6B")
-            self.append_output("=" * 50, "#808080")
+            self.append_output(f"Error running code: {str(e)}", _OUTPUT_ERROR)
+            self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
+
+    def write_temp_file(self, code):
+        """Write code to the temp file reused by every run and return its path"""
+        if self._temp_fd is None:
+            self._temp_fd, self._temp_path = tempfile.mkstemp(suffix='.py')
+
+        os.lseek(self._temp_fd, 0, os.SEEK_SET)
+        os.ftruncate(self._temp_fd, 0)
+        data = memoryview(code.encode('utf-8'))
+        while data:
+            data = data[os.write(self._temp_fd, data):]
+        return self._temp_path
+
+    def remove_temp_file(self):
+        """Close and delete the run temp file"""
+        if self._temp_fd is None:
+            return
+        try:
+            os.close(self._temp_fd)
+            os.unlink(self._temp_path)
+        except OSError:
+            pass
+        self._temp_fd = self._temp_path = None
 
     def handle_stdout(self):
         """Handle standard output from process"""
-        if self.process:
-            data = self.process.readAllStandardOutput()
-            text = bytes(data).decode('utf-8', errors='replace')
-            self.append_output(text.rstrip(), "#D4D4D4")
+        data = bytes(self.process.readAllStandardOutput())
+        self.queue_output(self._stdout_decoder.decode(data), _OUTPUT_TEXT)
 
     def handle_stderr(self):
         """Handle standard error from process"""
-        if self.process:
-            data = self.process.readAllStandardError()
-            text = bytes(data).decode('utf-8', errors='replace')
-            self.append_output(text.rstrip(), "#FF6B6B")
+        data = bytes(self.process.readAllStandardError())
+        self.queue_output(self._stderr_decoder.decode(data), _OUTPUT_ERROR)
 
-    def handle_finished(self, temp_file):
-        """Handle process completion"""
-        if self.process:
-            exit_code = self.process.exitCode()
-            self.append_output("", "#D4D4D4")
-            if exit_code == 0:
-                self.append_output(f"Process finished with exit code {exit_code}", "#6A8759")
-            else:
-                self.append_output(f"Process finished with exit code {exit_code}", "#FF6B6B")
-            self.append_output("=" * 50, "#808080")
+    def queue_output(self, text, color):
+        """Queue process output for the next flush, merging runs of the same stream"""
+        if not text:
+            return
+        if self._pending_output and self._pending_output[-1][1] == color:
+            self._pending_output[-1][0] += text
+        else:
+            self._pending_output.append([text, color])
+        if not self.output_timer.isActive():
+            self.output_timer.start()
+
+    def flush_output(self):
+        """Write queued process output to the console in one update"""
+        self.output_timer.stop()
+        pending, self._pending_output = self._pending_output, []
+        if not pending:
+            return
 
-            try:
-                os.unlink(temp_file)
-            except:
-                pass
+        # Streamed as written, so partial lines continue where the last chunk stopped
+        self.output.setUpdatesEnabled(False)
+        for text, color in pending:
+            self.write_output(text.replace('\r\n', '\n'), color)
+        self.output.setUpdatesEnabled(True)
+
+    def handle_finished(self):
+        """Handle process completion"""
+        self.queue_output(self._stdout_decoder.decode(b'', final=True), _OUTPUT_TEXT)
+        self.queue_output(self._stderr_decoder.decode(b'', final=True), _OUTPUT_ERROR)
+        self.flush_output()
+
+        # Leave one blank line after the output, ending its last line if unterminated
+        exit_code = self.process.exitCode()
+        if self.output.document().lastBlock().length() > 1:
+            self.append_output("", _OUTPUT_TEXT)
+        if exit_code == 0:
+            self.append_output(f"Process finished with exit code {exit_code}", _OUTPUT_OK)
+        else:
+            self.append_output(f"Process finished with exit code {exit_code}", _OUTPUT_ERROR)
+        self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
+        self.run_action.setEnabled(True)
+
+    def handle_process_error(self, error):
+        """Report a process that could not be started"""
+        # Every other error is followed by finished, which reports the exit
+        if error == QProcess.FailedToStart:
+            self.append_output(f"Error running code: {self.process.errorString()}", _OUTPUT_ERROR)
+            self.append_output(_OUTPUT_SEPARATOR, _OUTPUT_MUTED)
+            self.run_action.setEnabled(True)
 
     def new_file(self):
         """Create a new file"""
@@ -1963,21 +2464,30 @@ class PythonEditor(QMainWindow):
     def load_file(self, file_name):
         """Load a file into the editor"""
         try:
-            with open(file_name, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Qt folds \r\n and \r into paragraph breaks itself, so skip the text-mode wrapper
+            with open(file_name, 'rb') as f:
+                content = f.read().decode('utf-8')
 
             self.editor.setPlainText(content)
             self.current_file = file_name
             self.editor.auto_detect_indent = True
-            self.editor.detect_indentation()
-            self.editor.document().setModified(False)
-            self.update_status_bar()
+            self._doc.setModified(False)
             self.setWindowTitle(f"Microid - {file_name}")
+            # Let the loaded text paint before scanning it for indentation
+            QTimer.singleShot(0, self.finish_load)
             return True
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Could not open file:\n{e}")
             return False
 
+    def finish_load(self):
+        """Detect the loaded file's indentation and refresh the status bar"""
+        self.editor.detect_indentation()
+        # A file with content has been measured, so the first keystroke need not rescan it
+        if not self._doc.isEmpty():
+            self.editor.auto_detect_indent = False
+        self.update_status_bar()
+
     def open_file(self):
         """Open an existing file"""
         if self.maybe_save():
@@ -1991,6 +2501,9 @@ class PythonEditor(QMainWindow):
     def save_file(self):
         """Save the current file"""
         if self.current_file:
+            # Nothing to write if the buffer still matches the file on disk
+            if not self._doc.isModified() and os.path.exists(self.current_file):
+                return True
             return self.save_to_file(self.current_file)
         else:
             return self.save_file_as()
@@ -2010,19 +2523,26 @@ class PythonEditor(QMainWindow):
 
     def save_to_file(self, file_name):
         """Save content to a file"""
+        # QSaveFile writes beside the target and renames over it on commit, so
+        # a failed save never leaves a truncated file behind
+        save_file = QSaveFile(file_name)
         try:
-            with open(file_name, 'w', encoding='utf-8') as f:
-                f.write(self.editor.toPlainText())
+            if not save_file.open(QIODevice.WriteOnly):
+                raise OSError(save_file.errorString())
+            save_file.write(self.editor.plain_text().encode('utf-8'))
+            if not save_file.commit():
+                raise OSError(save_file.errorString())
 
-            self.editor.document().setModified(False)
+            self._doc.setModified(False)
             return True
         except Exception as e:
+            save_file.cancelWriting()
             QMessageBox.critical(self, "Error", f"Could not save file:\n{e}")
             return False
 
     def maybe_save(self):
         """Prompt to save if document is modified"""
-        if self.editor.document().isModified():
+        if self._doc.isModified():
             ret = QMessageBox.question(
                 self,
                 "Save Changes?",
@@ -2051,6 +2571,7 @@ class PythonEditor(QMainWindow):
     def closeEvent(self, event):
         """Handle window close event"""
         if self.maybe_save():
+            self.remove_temp_file()
             event.accept()
         else:
             event.reject()
@@ -2083,8 +2604,9 @@ class PythonEditor(QMainWindow):
                 event.acceptProposedAction()
 
 
-def set_light_palette(app):
-    """Set light theme palette for the entire application"""
+@lru_cache(maxsize=None)
+def _light_palette():
+    """Build the light theme palette once"""
     palette = QPalette()
 
     # Base colors
@@ -2108,11 +2630,17 @@ def set_light_palette(app):
     palette.setColor(QPalette.Disabled, QPalette.ButtonText, QColor("#808080"))
     palette.setColor(QPalette.Disabled, QPalette.HighlightedText, QColor("#808080"))
 
-    app.setPalette(palette)
+    return palette
 
 
-def set_dark_palette(app):
-    """Set dark theme palette for the entire application"""
+def set_light_palette(app):
+    """Set light theme palette for the entire application"""
+    app.setPalette(_light_palette())
+
+
+@lru_cache(maxsize=None)
+def _dark_palette():
+    """Build the dark theme palette once"""
     palette = QPalette()
 
     # Base colors
@@ -2136,7 +2664,12 @@ def set_dark_palette(app):
     palette.setColor(QPalette.Disabled, QPalette.ButtonText, QColor("#808080"))
     palette.setColor(QPalette.Disabled, QPalette.HighlightedText, QColor("#808080"))
 
-    app.setPalette(palette)
+    return palette
+
+
+def set_dark_palette(app):
+    """Set dark theme palette for the entire application"""
+    app.setPalette(_dark_palette())
 
 
 def main():